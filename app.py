@@ -4,6 +4,12 @@ import plotly.express as px
 import os
 import json
 import base64
+import heapq
+import math
+import multiprocessing
+import random
+import re
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from io import BytesIO
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
@@ -43,6 +49,8 @@ CATEGORY_MAPPING = {
 }
 
 LOGO_PNG = "assets/deen_logo.png"
+SOURCE_COL = "__source__"  # internal sheet tag; shown as "Source" and never clashes with user columns
+PARALLEL_PARSE_MIN_BYTES = 4 * 1024 * 1024  # below this, pool start-up costs more than it saves
 
 def load_logo():
     """Loads logo as base64 string from assets/deen_logo.png."""
@@ -405,36 +413,331 @@ def get_product_category(name):
         
     return 'Others'
 
-def find_columns(df):
-    """Auto-detects columns from dataframe."""
+CURRENCY_PATTERN = re.compile(r'(?i)^(?:tk\.?|bdt|৳|\$|rs\.?|usd)?\s*[\d,]+(?:\.\d+)?\s*(?:tk|bdt|৳|/-)?$')
+CURRENCY_SYMBOLS = re.compile(r'(?i)tk|bdt|৳|\$|rs\.?|usd|/-')
+BD_PHONE_PATTERN = re.compile(r'^(?:\+?88)?0?1\d{9}$')
+PHONE_PATTERN = re.compile(r'^(?:\+?88)?0?1\d{9}$|^\+?\d{10,13}$')
+NOT_ORDER_ID_WORDS = {'sku', 'code', 'barcode', 'style', 'article'}
+
+def sample_rows(df, sample_size=1000, seed=0):
+    """Returns a bounded random sample of rows without scanning the whole frame."""
+    if len(df) <= sample_size:
+        return df
+    positions = sorted(random.Random(seed).sample(range(len(df)), sample_size))
+    return df.iloc[positions]
+
+def parse_numeric(s):
+    """Parses plain or currency-formatted numbers; returns (values, is_currency) series."""
+    if pd.api.types.is_numeric_dtype(s):
+        return pd.to_numeric(s, errors='coerce'), pd.Series(False, index=s.index)
+    text = s.astype(str).str.strip()
+    is_currency = text.str.contains(CURRENCY_SYMBOLS) & text.str.match(CURRENCY_PATTERN)
+    cleaned = text.where(~text.str.match(CURRENCY_PATTERN), text.str.replace(r'[^\d.]', '', regex=True))
+    return pd.to_numeric(cleaned, errors='coerce'), is_currency
+
+def is_line_total(total, price, qty):
+    """True when total is row-wise price x qty, i.e. a line total rather than a unit price."""
+    rows = qty > 1
+    if rows.sum() < 5:
+        return False
+    diff = (price[rows] * qty[rows] - total[rows]).abs()
+    return (diff <= 0.01 * total[rows].abs() + 0.5).mean() >= 0.9
+
+def profile_column(values):
+    """Computes content features used to guess what a column holds."""
+    s = values.dropna()
+    if s.empty:
+        return None
+    text = s.astype(str).str.strip()
+    numeric, is_currency = parse_numeric(s)
+    is_numeric = numeric.notna()
+    digits = text.str.replace(r'\.0$', '', regex=True).str.replace(r'[\s\-()]', '', regex=True)
+
+    has_digit = text.str.contains(r'\d')
+    if pd.api.types.is_datetime64_any_dtype(s):
+        date_rate = 1.0
+    elif is_numeric.all() or has_digit.mean() < 0.5:
+        # Per-cell date parsing is slow, so skip columns that cannot be dates
+        date_rate = 0.0
+    else:
+        # Estimate from at most 100 cells, since mixed-format parsing goes cell by cell
+        candidates = text[~is_numeric]
+        dates = pd.to_datetime(candidates.iloc[:100], errors='coerce', format='mixed')
+        date_rate = dates.notna().mean() * len(candidates) / len(s)
+
+    nums = numeric[is_numeric]
+    return {
+        'numeric': is_numeric.mean(),
+        'currency': is_currency.mean(),
+        'integer': (nums == nums.round()).mean() if not nums.empty else 0.0,
+        'median': nums.median() if not nums.empty else 0.0,
+        'date': date_rate,
+        'phone': digits.str.match(PHONE_PATTERN).mean(),
+        'bd_phone': digits.str.match(BD_PHONE_PATTERN).mean(),
+        'alpha': text.str.contains(r'[A-Za-z]').mean(),
+        'words': text.str.contains(r'[A-Za-z]+\s+\S').mean(),
+        'has_digit': has_digit.mean(),
+        'alnum': (has_digit & text.str.contains(r'[A-Za-z]')).mean(),
+        'unique': s.nunique() / len(s),
+        'distinct': s.nunique(),
+    }
+
+def score_column(key, prof, hint=False):
+    """Scores how well a column profile fits a mapping key (0 to 1).
+
+    Optional keys only accept loose content (any long number as a phone, unique
+    integers as order ids) when the header hints at the key. Cost needs a header
+    hint or currency formatting to clear the threshold.
+    """
+    not_phone = 1 - prof['phone']
+    if key == 'phone':
+        return prof['phone'] if hint else prof['bd_phone']
+    if key == 'date':
+        return prof['date'] if hint or prof['date'] >= 0.8 else 0.0
+    if key == 'qty':
+        small = 0 < prof['median'] <= 100
+        return prof['numeric'] * prof['integer'] * not_phone * small
+    if key == 'cost':
+        if prof['median'] <= 0:
+            return 0.0
+        score = prof['numeric'] * not_phone * (0.6 + 0.4 * max(prof['currency'], float(prof['median'] >= 50)))
+        # A bare positive number is weak evidence; totals and discounts look the same
+        return score if hint or prof['currency'] >= 0.5 else min(score, 0.45)
+    if key == 'name':
+        variety = min(1.0, prof['distinct'] / 10)
+        return prof['alpha'] * (1 - prof['numeric']) * (1 - prof['date']) * variety * (0.5 + 0.5 * prof['words'])
+    if key == 'order_id':
+        id_like = prof['alnum']
+        if hint:
+            id_like = max(id_like, prof['numeric'] * prof['integer'] * (1 - prof['currency']))
+        return 0.8 * id_like * not_phone * (1 - prof['date']) * (1 - prof['words']) * min(1.0, prof['unique'] * 3)
+    return 0.0
+
+def find_columns(df, sample_size=1000):
+    """Auto-detects columns from header names, then from sampled column content.
+
+    Exact header matches win outright. Remaining keys are assigned by scoring a
+    bounded random sample of each column, with whole-word header matches as a hint.
+    """
+    return detect_columns(sample_rows(df, sample_size))
+
+@st.cache_data(show_spinner=False)
+def detect_columns(sample):
+    """Cached detection over a sampled frame, so Streamlit reruns skip re-profiling."""
     mapping = {
         'name': ['item name', 'product name', 'product', 'item', 'title', 'description', 'name'],
-        'cost': ['item cost', 'price', 'unit price', 'cost', 'rate', 'mrp', 'selling price'],
-        'qty': ['quantity', 'qty', 'units', 'sold', 'count', 'total quantity'],
+        'cost': ['item cost', 'price', 'unit price', 'cost', 'rate', 'mrp', 'selling price', 'amount'],
+        'qty': ['quantity', 'qty', 'units', 'sold', 'count', 'total quantity', 'qnty', 'pcs'],
         'date': ['date', 'order date', 'month', 'time', 'created at'],
         'order_id': ['order id', 'order #', 'invoice number', 'invoice #', 'order number', 'transaction id', 'id'],
         'phone': ['phone', 'contact', 'mobile', 'cell', 'phone number', 'customer phone']
     }
     found = {}
-    actual_cols = list(df.columns)
+    actual_cols = list(sample.columns)
     lower_cols = [str(c).strip().lower() for c in actual_cols]
     
+    # Exact match
     for key, aliases in mapping.items():
-        # Exact match
         for alias in aliases:
-            if alias in lower_cols:
+            if alias in lower_cols and actual_cols[lower_cols.index(alias)] not in found.values():
                 found[key] = actual_cols[lower_cols.index(alias)]
                 break
-        # Partial match
-        if key not in found:
-            for i, col in enumerate(lower_cols):
-                if any(alias in col for alias in aliases):
-                    found[key] = actual_cols[i]
-                    break
+
+    # Whole-word header hints (avoids 'id' matching inside 'paid')
+    col_words = [set(re.findall(r'[a-z#]+', c)) for c in lower_cols]
+    def header_hint(key, i):
+        return float(any(set(alias.split()) <= col_words[i] for alias in mapping[key]))
+
+    remaining = [k for k in mapping if k not in found]
+    free_cols = [i for i, c in enumerate(actual_cols) if c not in found.values()]
+    profiles = {i: profile_column(sample.iloc[:, i]) for i in free_cols} if remaining else {}
+    candidates = []
+    for key in remaining:
+        for i in free_cols:
+            if key == 'order_id' and col_words[i] & NOT_ORDER_ID_WORDS:
+                continue
+            hint = header_hint(key, i)
+            content = score_column(key, profiles[i], hint) if profiles[i] else 0.0
+            score = content + 0.3 * hint if profiles[i] else hint
+            if score >= 0.5 and (content > 0 or not profiles[i]):
+                candidates.append((score, key, i))
+
+    # Greedy assignment: best (key, column) pairs first, each used once
+    for score, key, i in sorted(candidates, key=lambda c: -c[0]):
+        if key not in found and actual_cols[i] not in found.values():
+            found[key] = actual_cols[i]
+
+    # Cost must be a unit price: if it equals another column x qty, use that column instead
+    if 'cost' in found and 'qty' in found and len(sample):
+        cost = parse_numeric(sample.iloc[:, actual_cols.index(found['cost'])])[0]
+        qty = parse_numeric(sample.iloc[:, actual_cols.index(found['qty'])])[0]
+        for i, col in enumerate(actual_cols):
+            if col in found.values():
+                continue
+            price = parse_numeric(sample.iloc[:, i])[0]
+            if price.notna().mean() >= 0.9 and is_line_total(cost, price, qty):
+                found['cost'] = col
+                break
     return found
 
-def process_analytics(df, mapping):
-    """Core data processing and metric calculation."""
+def available_cpus():
+    """CPUs this process may run on (respects container/affinity limits, unlike os.cpu_count)."""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+@st.cache_data(show_spinner="Parsing sheets...", max_entries=8, ttl=3600)
+def load_sources(files):
+    """Parses every sheet of every uploaded (name, bytes) file, in parallel across processes.
+
+    Returns a list of (source label, dataframe), skipping empty sheets.
+    """
+    workers = available_cpus()
+    tasks = []
+    for name, content in files:
+        if name.endswith('.csv'):
+            tasks.append(([name], pd.read_csv, content, {}))
+            continue
+        sheets = pd.ExcelFile(BytesIO(content)).sheet_names
+        labels = {sheet: f"{name} / {sheet}" if len(sheets) > 1 else name for sheet in sheets}
+        # Each task ships the whole workbook and reopens it, so give every worker
+        # a group of sheets rather than one task per sheet
+        size = math.ceil(len(sheets) / workers)
+        for group in (sheets[i:i + size] for i in range(0, len(sheets), size)):
+            tasks.append(([labels[sheet] for sheet in group], pd.read_excel, content, {'sheet_name': group}))
+
+    total_bytes = sum(len(content) for _, content in files)
+    if len(tasks) == 1 or workers == 1 or total_bytes < PARALLEL_PARSE_MIN_BYTES:
+        results = [reader(BytesIO(content), **kwargs) for _, reader, content, kwargs in tasks]
+    else:
+        # openpyxl parsing holds the GIL, so processes (not threads) are needed to use every core.
+        # forkserver avoids forking the multi-threaded Streamlit server while other sessions hold
+        # locks; it is unavailable on Windows, where spawn is used instead.
+        method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        with ProcessPoolExecutor(max_workers=min(len(tasks), workers), mp_context=multiprocessing.get_context(method)) as pool:
+            futures = [pool.submit(reader, BytesIO(content), **kwargs) for _, reader, content, kwargs in tasks]
+            results = [f.result() for f in futures]
+
+    sources = []
+    for (labels, *_), result in zip(tasks, results):
+        frames = list(result.values()) if isinstance(result, dict) else [result]
+        sources.extend((label, df) for label, df in zip(labels, frames) if not df.empty)
+    return sources
+
+def combine_sources(sources):
+    """Concatenates parsed sheets into one frame tagged with a SOURCE_COL column.
+
+    Column mappings are detected once per distinct header. The first sheet with
+    Product Name, Price and Quantity sets the canonical column names, and other
+    sheets' mapped columns are renamed to match. Sheets missing any of those are
+    left out. Returns the combined frame and the labels of skipped sheets.
+    """
+    if len(sources) == 1:
+        return sources[0][1], []
+    mandatory = ['name', 'cost', 'qty']
+    header_maps = {}
+    for _, df in sources:
+        header = tuple(df.columns)
+        if header not in header_maps:
+            header_maps[header] = find_columns(df)
+    usable = [(label, df) for label, df in sources if all(k in header_maps[tuple(df.columns)] for k in mandatory)]
+    if not usable:
+        # Nothing maps automatically; keep every sheet and let the user map by hand
+        return pd.concat([df.assign(**{SOURCE_COL: label}) for label, df in sources], ignore_index=True), []
+
+    base_map = header_maps[tuple(usable[0][1].columns)]
+    frames = []
+    for label, df in usable:
+        col_map = header_maps[tuple(df.columns)]
+        renames = {col_map[k]: base_map[k] for k in col_map if k in base_map and col_map[k] != base_map[k]}
+        # Move aside any existing column that already uses a target name
+        for target in list(renames.values()):
+            if target in df.columns and target not in renames:
+                renames[target] = f"{target} ({label})"
+        frames.append(df.rename(columns=renames).assign(**{SOURCE_COL: label}))
+    skipped = [label for label, df in sources if all(label != u for u, _ in usable)]
+    return pd.concat(frames, ignore_index=True), skipped
+
+class TopItemsSketch:
+    """Space-Saving heavy-hitters sketch for bounded-memory top product rankings.
+
+    Keeps at most ceil(1 / epsilon) counters, so any reported amount overestimates
+    the true amount by no more than epsilon * (total amount seen). Quantities only
+    count rows seen since a product last (re)entered the sketch, so they are lower
+    bounds and reported as 'Min Qty'. Negative amounts (refunds, bad rows) are
+    clamped to 0, so sketch totals can differ slightly from exact mode.
+    """
+
+    def __init__(self, k=20, epsilon=0.001):
+        self.k = k
+        self.epsilon = epsilon
+        self.capacity = max(k, math.ceil(1 / epsilon))
+        self.total_weight = 0.0
+        self.counts = {}
+        self.errors = {}
+        self.qty = {}
+        self.category = {}
+        self._heap = []
+
+    def _evict_min(self):
+        # Lazy heap: skip entries whose count changed since they were pushed
+        while True:
+            count, key = heapq.heappop(self._heap)
+            if self.counts.get(key) == count:
+                break
+        for store in (self.counts, self.errors, self.qty, self.category):
+            del store[key]
+        return count
+
+    def add(self, key, amount, qty=0, category=None):
+        # Space-Saving needs non-negative weights
+        amount = max(float(amount), 0.0)
+        self.total_weight += amount
+        if key in self.counts:
+            self.counts[key] += amount
+            self.qty[key] += qty
+        else:
+            floor = self._evict_min() if len(self.counts) >= self.capacity else 0.0
+            self.counts[key] = floor + amount
+            self.errors[key] = floor
+            self.qty[key] = qty
+            self.category[key] = category
+        heapq.heappush(self._heap, (self.counts[key], key))
+        if len(self._heap) > 4 * self.capacity:
+            self._heap = [(c, k) for k, c in self.counts.items()]
+            heapq.heapify(self._heap)
+
+    def update(self, chunk):
+        """Consumes a chunk with Clean_Name, Clean_Qty, Total Amount and Category columns."""
+        agg = chunk.groupby('Clean_Name', sort=False).agg({'Clean_Qty': 'sum', 'Total Amount': 'sum', 'Category': 'first'})
+        for name, row in zip(agg.index, agg.itertuples(index=False)):
+            self.add(name, row[1], row[0], row[2])
+
+    @property
+    def guaranteed_bound(self):
+        """A priori overestimate bound: total amount seen / number of counters (<= epsilon * total)."""
+        return self.total_weight / self.capacity
+
+    @property
+    def error_bound(self):
+        """Observed maximum overestimate of any reported amount (never above guaranteed_bound)."""
+        if len(self.counts) < self.capacity:
+            return 0.0
+        return min(self.counts.values())
+
+    def top_items(self):
+        top = heapq.nlargest(self.k, self.counts.items(), key=lambda kv: kv[1])
+        return pd.DataFrame(
+            [(key, self.qty[key], amount, self.category[key], self.errors[key]) for key, amount in top],
+            columns=['Product Name', 'Min Qty', 'Total Amount', 'Category', 'Max Error']
+        )
+
+def process_analytics(df, mapping, top_k=None, top_epsilon=0.001, chunk_size=100_000):
+    """Core data processing and metric calculation.
+
+    With top_k set, top products are estimated with a TopItemsSketch fed in
+    chunks instead of an exact groupby over every product name.
+    """
     df = df.copy()
     
     # 1. Clean Data (Handle commas, currency symbols, and whitespace)
@@ -479,10 +782,25 @@ def process_analytics(df, mapping):
     drilldown = df.groupby(['Category', 'Clean_Cost']).agg({'Clean_Qty': 'sum', 'Total Amount': 'sum'}).reset_index()
     drilldown.columns = ['Category', 'Price', 'Total Qty', 'Total Amount']
     
-    top_items = df.groupby('Clean_Name').agg({'Clean_Qty': 'sum', 'Total Amount': 'sum', 'Category': 'first'}).reset_index()
-    top_items.columns = ['Product Name', 'Total Qty', 'Total Amount', 'Category']
-    top_items = top_items.sort_values('Total Amount', ascending=False)
+    if top_k:
+        sketch = TopItemsSketch(top_k, top_epsilon)
+        for start in range(0, len(df), chunk_size):
+            sketch.update(df.iloc[start:start + chunk_size])
+        top_items = sketch.top_items()
+        top_items_error = sketch.error_bound
+        top_items_bound = sketch.guaranteed_bound
+    else:
+        top_items = df.groupby('Clean_Name').agg({'Clean_Qty': 'sum', 'Total Amount': 'sum', 'Category': 'first'}).reset_index()
+        top_items.columns = ['Product Name', 'Total Qty', 'Total Amount', 'Category']
+        top_items = top_items.sort_values('Total Amount', ascending=False)
+        top_items_error = 0.0
+        top_items_bound = 0.0
     
+    source_summary = None
+    if SOURCE_COL in df.columns:
+        source_summary = df.groupby(SOURCE_COL, sort=False).agg({'Clean_Qty': 'sum', 'Total Amount': 'sum'}).reset_index()
+        source_summary.columns = ['Source', 'Total Qty', 'Total Amount']
+
     # 4. Basket Metrics
     avg_basket_value = 0
     group_cols = [c for c in [mapping.get('order_id'), mapping.get('phone')] if c and c in df.columns]
@@ -495,6 +813,9 @@ def process_analytics(df, mapping):
         'drilldown': drilldown,
         'summary': summary,
         'top_items': top_items,
+        'top_items_error': top_items_error,
+        'top_items_bound': top_items_bound,
+        'source_summary': source_summary,
         'timeframe': timeframe,
         'avg_basket_value': avg_basket_value,
         'total_qty': t_qty,
@@ -554,19 +875,28 @@ def main():
     
     st.title("🚀 Sales Performance Dashboard")
     
-    uploaded_file = st.file_uploader("Upload Sales Data (Excel or CSV)", type=['xlsx', 'csv'])
+    uploaded_files = st.file_uploader("Upload Sales Data (Excel or CSV)", type=['xlsx', 'csv'], accept_multiple_files=True)
     
-    if uploaded_file:
+    if uploaded_files:
         try:
-            df = pd.read_csv(uploaded_file) if uploaded_file.name.endswith('.csv') else pd.read_excel(uploaded_file)
-            st.success(f"Attached: {uploaded_file.name}")
+            sources = load_sources(tuple((f.name, f.getvalue()) for f in uploaded_files))
+            if not sources:
+                raise ValueError("No data found in the uploaded files.")
+            df, skipped = combine_sources(sources)
+            st.success(f"Attached: {', '.join(f.name for f in uploaded_files)}")
+            if len(sources) > 1:
+                st.caption(f"Combined {len(sources) - len(skipped)} sheets into {len(df):,} rows. Per-sheet totals appear under 'By Source'.")
+            if skipped:
+                st.warning(f"Skipped sheets without recognisable Product Name, Price and Quantity columns: {', '.join(skipped)}.")
             
+            # The internal sheet tag is not a user column, so keep it out of preview and mapping
+            df_user = df.drop(columns=SOURCE_COL, errors='ignore')
             with st.expander("🔍 Preview Data", expanded=False):
-                st.dataframe(df.head(10), use_container_width=True)
+                st.dataframe(df_user.head(10), use_container_width=True)
 
             # Column Mapping Section
-            auto_cols = find_columns(df)
-            all_cols = list(df.columns)
+            auto_cols = find_columns(df_user)
+            all_cols = list(df_user.columns)
             mandatory_keys = ['name', 'cost', 'qty']
             is_mapped = all(k in auto_cols for k in mandatory_keys)
             
@@ -591,10 +921,16 @@ def main():
             }
             
             with st.expander("🔍 Preview Data"):
-                st.dataframe(df.head(10), use_container_width=True)
+                st.dataframe(df_user.head(10), use_container_width=True)
+
+            with st.expander("⚙️ Large File Options"):
+                use_sketch = st.checkbox("Approximate top products (bounded memory)", value=False)
+                oc1, oc2 = st.columns(2)
+                top_k = oc1.number_input("Top K Products", min_value=1, max_value=1000, value=20, step=1)
+                top_eps = oc2.number_input("Max Error (share of revenue)", min_value=0.0001, max_value=0.1, value=0.001, step=0.0005, format="%.4f")
 
             if st.button("Generate Analytics"):
-                results = process_analytics(df, mapping)
+                results = process_analytics(df, mapping, top_k=int(top_k) if use_sketch else None, top_epsilon=top_eps)
                 
                 # Metrics Row
                 m1, m2, m3, m4 = st.columns(4)
@@ -624,7 +960,10 @@ def main():
                                        title='Volume by Category', color_discrete_sequence=color_seq), use_container_width=True)
                 
                 # Data Tables
-                t1, t2 = st.tabs(["📊 Category Summary", "💰 Price-wise Category"])
+                tab_names = ["📊 Category Summary", "💰 Price-wise Category", "🏆 Top Products"]
+                if results['source_summary'] is not None:
+                    tab_names.append("🗂️ By Source")
+                t1, t2, t3, *t_source = st.tabs(tab_names)
                 
                 df_breakdown = results['summary'].sort_values('Category', ascending=True).copy()
                 
@@ -650,6 +989,15 @@ def main():
                 with t2: 
                     st.dataframe(df_drill[['Category', 'Price', 'Qty', 'Total Amount']], use_container_width=True)
                 
+                with t3:
+                    st.dataframe(results['top_items'].head(int(top_k)), use_container_width=True, hide_index=True)
+                    if use_sketch:
+                        st.caption(f"Estimated with a Space-Saving sketch: amounts may be overstated by up to TK {results['top_items_error']:,.0f} (guaranteed at most TK {results['top_items_bound']:,.0f}; see Max Error per product) and Min Qty may undercount products that re-entered the sketch.")
+                
+                if t_source:
+                    with t_source[0]:
+                        st.dataframe(results['source_summary'], use_container_width=True, hide_index=True)
+                
                 # Export
                 buf = BytesIO()
                 with pd.ExcelWriter(buf, engine='openpyxl') as writer:
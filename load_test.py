@@ -0,0 +1,160 @@
+"""Concurrent-session load test for the Streamlit dashboard.
+
+Simulates N sessions with Streamlit's AppTest, each uploading a synthetic sales
+file, confirming the column mapping and clicking "Generate Analytics". Every
+concurrency level runs in a fresh process so peak RSS is measured per level.
+Runs fully offline.
+
+Usage:
+    python load_test.py --sessions 1,2,4,8 --rows 20000 --format csv
+"""
+import argparse
+import multiprocessing as mp
+import os
+import queue as queue_mod
+import random
+import resource
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+import pandas as pd
+from streamlit.testing.v1 import AppTest
+
+from app import CATEGORY_MAPPING
+
+APP_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+STAGES = ['upload', 'mapping', 'generate']
+MAPPING_LABELS = {
+    'Product Name': 'Item Name',
+    'Price': 'Item Cost',
+    'Quantity': 'Quantity',
+    'Date (Opt)': 'Order Date',
+    'Order ID (Opt)': 'Order ID',
+    'Phone (Opt)': 'Phone',
+}
+MIME_TYPES = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+def make_sales_file(rows, fmt, seed=0):
+    """Builds a synthetic sales export and returns it as bytes."""
+    rng = random.Random(seed)
+    keywords = [kw for kws in CATEGORY_MAPPING.values() for kw in kws] + ['t-shirt', 'full sleeve shirt']
+    df = pd.DataFrame({
+        'Item Name': [f"{rng.choice(keywords).title()} {rng.randint(1, 500)}" for _ in range(rows)],
+        'Item Cost': [f"TK {rng.randint(200, 4000):,}" for _ in range(rows)],
+        'Quantity': [rng.randint(1, 5) for _ in range(rows)],
+        'Order Date': pd.Timestamp('2026-01-01') + pd.to_timedelta([rng.randint(0, 90) for _ in range(rows)], unit='D'),
+        'Order ID': [f"ORD-{rng.randint(1, max(rows // 3, 1))}" for _ in range(rows)],
+        'Phone': [f"01{rng.randint(300000000, 999999999)}" for _ in range(rows)],
+    })
+    buf = BytesIO()
+    if fmt == 'csv':
+        df.to_csv(buf, index=False)
+    else:
+        df.to_excel(buf, index=False)
+    return buf.getvalue()
+
+def run_session(content, fmt, timeout):
+    """Drives one session through all stages and returns per-stage latency in seconds."""
+    timings = {}
+    at = AppTest.from_file(APP_FILE, default_timeout=timeout)
+    at.run()
+
+    start = time.perf_counter()
+    at.file_uploader[0].upload(f"sales.{fmt}", content, MIME_TYPES[fmt]).run()
+    timings['upload'] = time.perf_counter() - start
+
+    for box in at.selectbox:
+        if box.label in MAPPING_LABELS:
+            box.set_value(MAPPING_LABELS[box.label])
+    start = time.perf_counter()
+    at.run()
+    timings['mapping'] = time.perf_counter() - start
+
+    button = next(b for b in at.button if b.label == "Generate Analytics")
+    start = time.perf_counter()
+    button.click().run()
+    timings['generate'] = time.perf_counter() - start
+
+    if at.exception or any("Processing Error" in e.value for e in at.error):
+        raise RuntimeError(f"Session failed: {[e.value for e in at.exception] or [e.value for e in at.error]}")
+    return timings
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[idx]
+
+def run_level(sessions, rows, fmt, iterations, timeout, queue):
+    """Runs one concurrency level inside its own process and reports stats via queue."""
+    total = sessions * iterations
+    # Distinct content per session so the app's parse cache never serves a later session
+    contents = [make_sales_file(rows, fmt, seed=i) for i in range(total)]
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=sessions) as pool:
+            results = list(pool.map(lambda content: run_session(content, fmt, timeout), contents))
+    except Exception as e:
+        queue.put({'error': str(e)})
+        return
+    wall = time.perf_counter() - start
+
+    stats = {'sessions': sessions, 'file_kb': len(contents[0]) / 1024, 'throughput': total / wall,
+             'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}
+    for stage in STAGES + ['total']:
+        values = [sum(r.values()) if stage == 'total' else r[stage] for r in results]
+        stats[stage] = {p: percentile(values, p) for p in (50, 95, 99)}
+    queue.put(stats)
+
+def wait_for_level(proc, queue, timeout):
+    """Waits for a level's stats, failing loudly if the process dies or stalls."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            return queue.get(timeout=1)
+        except queue_mod.Empty:
+            if not proc.is_alive():
+                raise SystemExit(f"Load test process exited with code {proc.exitcode} before reporting stats")
+    proc.terminate()
+    raise SystemExit(f"Load test process timed out after {timeout:.0f}s")
+
+def print_report(all_stats):
+    header = f"{'N':>4} {'Stage':<9} {'p50 (s)':>9} {'p95 (s)':>9} {'p99 (s)':>9} {'Sess/s':>8} {'Peak RSS (MB)':>14}"
+    print(header)
+    print("-" * len(header))
+    for stats in all_stats:
+        for stage in STAGES + ['total']:
+            lat = stats[stage]
+            extra = f"{stats['throughput']:>8.2f} {stats['peak_rss_mb']:>14.1f}" if stage == 'total' else ""
+            print(f"{stats['sessions']:>4} {stage:<9} {lat[50]:>9.3f} {lat[95]:>9.3f} {lat[99]:>9.3f} {extra}")
+        print()
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent-session load test for the sales dashboard.")
+    parser.add_argument('--sessions', default="1,2,4,8", help="Comma-separated concurrency levels.")
+    parser.add_argument('--rows', type=int, default=10000, help="Rows in each synthetic upload.")
+    parser.add_argument('--format', choices=sorted(MIME_TYPES), default='csv', help="Synthetic file format.")
+    parser.add_argument('--iterations', type=int, default=3, help="Sessions run per concurrent slot.")
+    parser.add_argument('--timeout', type=float, default=300, help="Per-stage script timeout in seconds.")
+    args = parser.parse_args()
+
+    ctx = mp.get_context('spawn')
+    all_stats = []
+    for sessions in [int(n) for n in args.sessions.split(',')]:
+        queue = ctx.Queue()
+        proc = ctx.Process(target=run_level, args=(sessions, args.rows, args.format, args.iterations, args.timeout, queue))
+        proc.start()
+        stats = wait_for_level(proc, queue, args.timeout * 3 * sessions * args.iterations)
+        proc.join()
+        if 'error' in stats:
+            raise SystemExit(f"N={sessions} failed: {stats['error']}")
+        all_stats.append(stats)
+        print(f"N={sessions}: done ({stats['file_kb']:,.0f} KB file)")
+    print()
+    print_report(all_stats)
+
+if __name__ == "__main__":
+    main()